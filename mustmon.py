@@ -8,18 +8,24 @@ import time
 import sys
 import struct
 import logging
+import logging.handlers
+import queue
 import signal
 import threading
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Optional, List, Tuple
 from collections import namedtuple
+import gzip
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import string
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from prometheus_client import Gauge, generate_latest, CONTENT_TYPE_LATEST
 import paho.mqtt.client as mqtt
 import yaml
 import os
+import operator
+import platform
 import argparse
 
 # Experimental Modbus parser (optional)
@@ -37,6 +43,57 @@ try:
 except ImportError:
     BATTERY_CALCULATOR_AVAILABLE = False
 
+# LibYAML-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+# Fast JSON serializer (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def json_dumps_bytes(obj):
+    """Serialize to compact UTF-8 JSON bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+
+# ============================================================================
+# Modbus RTU framing
+# ============================================================================
+
+def _build_crc16_table():
+    """CRC-16/MODBUS lookup table (reflected polynomial 0xA001)"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = _build_crc16_table()
+
+
+def crc16_modbus(data):
+    """CRC-16/MODBUS of data, one table lookup per byte"""
+    crc = 0xFFFF
+    for b in data:
+        crc = (crc >> 8) ^ CRC16_TABLE[(crc ^ b) & 0xFF]
+    return crc
+
+
+def build_read_frame(unit, address, count, function=0x03):
+    """Read registers request frame: unit, function, address, count, CRC (little-endian)"""
+    body = struct.pack('>BBHH', unit, function, address, count)
+    return body + crc16_modbus(body).to_bytes(2, 'little')
+
 # ============================================================================
 # Constants
 # ============================================================================
@@ -45,33 +102,42 @@ except ImportError:
 SERIAL_BAUDRATE = 9600
 SERIAL_TIMEOUT = 2
 
-# UPS wakeup commands
-WAKEUP_COMMANDS = [
-    "0103271000018f7b",
-    "05034e210001c2ac",
-    "06034e210001c29f",
-    "0a03753000019f72",
-]
+# UPS Modbus unit id
+UPS_UNIT_ID = 0x0A
+
+# UPS wakeup commands (single register reads from each unit id)
+WAKEUP_CMD_BYTES = (
+    build_read_frame(0x01, 10000, 1),
+    build_read_frame(0x05, 20001, 1),
+    build_read_frame(0x06, 20001, 1),
+    build_read_frame(UPS_UNIT_ID, 30000, 1),
+)
 
 # UPS protocol commands
-UPS_COMMAND_MAIN_PARAMS = "0a037530001b1eb9"
-UPS_COMMAND_BATTERY = "0a037918000a5ded"
+CMD_MAIN = build_read_frame(UPS_UNIT_ID, 30000, 27)  # Main parameters
+# The 31000 battery block is not polled: its register layout is unknown, and the
+# battery voltage/level already come from REG_BATTERY_VOLTAGE/REG_BATTERY_LEVEL
 
 # Timing constants
-WAKEUP_DELAY = 0.3
+PORT_SETTLE_DELAY = 0.05  # USB-serial control lines settle well within 50 ms
 COMMAND_DELAY = 0.5
 POST_WAKEUP_DELAY = 0.5
 CONNECTION_RETRY_DELAY = 10
 ERROR_RETRY_DELAY = 5
 
-# Telemetry value ranges (raw values from UPS)
-VOLTAGE_RANGE = (2200, 2300)  # 220-230V in raw units (divide by 10)
-FREQUENCY_RANGE = (490, 510)  # 49-51Hz in raw units (divide by 10)
-BATTERY_VOLTAGE_RANGE = (130, 140)  # 13-14V in raw units (divide by 10)
-BATTERY_LEVEL_RANGE = (95, 105)  # 95-105%
-LOAD_PERCENT_RANGE = (10, 20)  # 10-20%
-LOAD_POWER_RANGE = (130, 150)  # 130-150W
-TEMPERATURE_RANGE = (30, 40)  # 30-40°C
+# Main parameters response layout: 16-bit big-endian registers after the
+# 5-byte header (same addressing as the direct registers in ups_modbus_parser)
+MAIN_PARAMS_REGISTERS = 27
+MAIN_PARAMS_STRUCT = struct.Struct(f'>{MAIN_PARAMS_REGISTERS}H')
+REG_INPUT_VOLTAGE = 4  # 0.1 V
+REG_INPUT_FREQUENCY = 5  # 0.1 Hz
+REG_OUTPUT_VOLTAGE = 6  # 0.1 V
+REG_OUTPUT_FREQUENCY = 7  # 0.1 Hz
+REG_LOAD_POWER = 9  # W
+REG_LOAD_PERCENT = 11  # %
+REG_BATTERY_VOLTAGE = 13  # 0.1 V
+REG_BATTERY_LEVEL = 16  # %
+REG_TEMPERATURE = 17  # °C (0.1 °C when >= 100)
 
 # Alarm thresholds
 MIN_INPUT_VOLTAGE = 180
@@ -79,10 +145,18 @@ MIN_BATTERY_LEVEL = 20
 MAX_TEMPERATURE = 40
 MAX_LOAD_PERCENT = 80
 
+# Alarm rules: (telemetry field, comparison, threshold, message)
+ALARM_RULES = (
+    ("input_voltage", operator.lt, MIN_INPUT_VOLTAGE, "Низкое напряжение сети"),
+    ("battery_level", operator.lt, MIN_BATTERY_LEVEL, "Низкий заряд батареи"),
+    ("temperature", operator.gt, MAX_TEMPERATURE, "Высокая температура"),
+    ("load_percent", operator.gt, MAX_LOAD_PERCENT, "Высокая нагрузка"),
+)
+
 # Status thresholds
 ONLINE_VOLTAGE_THRESHOLD = 200
 
-@dataclass
+@dataclass(slots=True)
 class UPSTelemetry:
     input_voltage: float = 0.0
     output_voltage: float = 0.0
@@ -102,22 +176,30 @@ class UPSTelemetry:
     battery_time_remaining_hours: float = 0.0  # Remaining runtime (hours)
     battery_time_remaining_minutes: float = 0.0  # Remaining runtime (minutes)
 
+    def as_dict(self):
+        """Flat field dict; cheaper than dataclasses.asdict() for primitive fields"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
 class UPSWebDaemon:
     def __init__(self, port, web_port=8080, interval=30, 
                  mqtt_broker=None, mqtt_port=1883, mqtt_topic="ups/telemetry",
                  mqtt_username=None, mqtt_password=None,
                  log_level=logging.INFO, log_file="/tmp/ups_web_daemon.log", log_console=True,
                  max_errors=5, use_modbus_parser=False,
-                 battery_ah=55.0, inverter_eff=0.88, peukert_k=1.15):
+                 battery_ah=55.0, inverter_eff=0.88, peukert_k=1.15,
+                 mqtt_qos=0):
         self.port = port
         self.web_port = web_port
         self.interval = interval
         self.ser = None
-        self.running = True
+        self._stop_event = threading.Event()
         self.connection_errors = 0
         self.max_errors = max_errors
         self.current_telemetry = UPSTelemetry()
+        self.current_telemetry_dict = self.current_telemetry.as_dict()
+        self.current_alarms = ()  # Alarms for current_telemetry, computed once per poll (immutable snapshot)
         self.start_time = datetime.now()
+        self._start_monotonic = time.monotonic()  # uptime is immune to wall clock steps
         self.web_server = None  # Will be set by start_web_server
         
         # Battery calculation parameters
@@ -132,6 +214,7 @@ class UPSWebDaemon:
         self.mqtt_topic = mqtt_topic
         self.mqtt_username = mqtt_username
         self.mqtt_password = mqtt_password
+        self.mqtt_qos = mqtt_qos  # Periodic telemetry: QoS 0 avoids a PUBACK round-trip per sample
         self.mqtt_client = None
         
         # Prometheus metrics
@@ -150,24 +233,38 @@ class UPSWebDaemon:
         self.prom_status = Gauge('ups_status_string', 'UPS status string (online/on battery)')
         self.prom_warnings = Gauge('ups_recent_warnings_total', 'Total number of recent warnings')
         
-        # Cache for status labels to avoid recreating
+        # Battery level gauge children, bound on first use of each status
         self._status_labels = {}
         
         # Recent warnings storage (last 5)
         self.recent_warnings = []  # List of dicts: {"timestamp": str, "message": str}
         self.max_warnings = 5
 
+        # Bumped whenever telemetry or warnings change; keys the web page cache
+        self.state_version = 0
+        self._html_cache = (None, b'', b'')  # (state_version, page bytes, gzipped page bytes)
+        self._telemetry_json_cache = (None, b'')  # (state_version, /api/telemetry bytes)
+
         # Настройка логирования
         handlers = []
         if log_console:
             handlers.append(logging.StreamHandler(sys.stdout))
         if log_file:
             handlers.append(logging.FileHandler(log_file, mode='a'))
-        
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        # Console/file writes happen on the listener thread, off the polling path
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        self.log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+        self.log_listener.start()
+
         logging.basicConfig(
             level=log_level,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=handlers,
+            handlers=[queue_handler],
             force=True
         )
         self.logger = logging.getLogger('UPSWebDaemon')
@@ -192,7 +289,7 @@ class UPSWebDaemon:
     def signal_handler(self, signum, frame):
         """Обработчик сигналов для graceful shutdown"""
         self.logger.info(f"Получен сигнал {signum}, завершаем работу...")
-        self.running = False
+        self.stop()
         
         # Stop web server if it exists
         if self.web_server:
@@ -202,10 +299,23 @@ class UPSWebDaemon:
             except Exception as e:
                 self.logger.error(f"Ошибка при остановке веб-сервера: {e}")
 
+    @property
+    def running(self):
+        """Демон работает, пока не вызван stop()"""
+        return not self._stop_event.is_set()
+
+    def stop(self):
+        """Запрос остановки; прерывает ожидание в цикле мониторинга"""
+        self._stop_event.set()
+
+    def wait_for_stop(self, timeout=None):
+        """Блокирующее ожидание stop(); True если остановка запрошена"""
+        return self._stop_event.wait(timeout)
+
     def get_uptime(self):
-        """Получение времени работы демона"""
-        uptime = datetime.now() - self.start_time
-        hours, remainder = divmod(int(uptime.total_seconds()), 3600)
+        """Получение времени работы демона (по монотонным часам)"""
+        elapsed = int(time.monotonic() - self._start_monotonic)
+        hours, remainder = divmod(elapsed, 3600)
         minutes, seconds = divmod(remainder, 60)
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
@@ -222,7 +332,8 @@ class UPSWebDaemon:
             )
             self.ser.dtr = True
             self.ser.rts = False
-            time.sleep(1)
+            self.set_low_latency()
+            time.sleep(PORT_SETTLE_DELAY)
             self.ser.flushInput()
 
             self.logger.info(f"✅ Подключено к {self.port}")
@@ -235,10 +346,33 @@ class UPSWebDaemon:
 
             if self.connection_errors >= self.max_errors:
                 self.logger.error("⚠️  Слишком много ошибок подключения, завершаем работу")
-                self.running = False
+                self.stop()
 
             return False
 
+    def set_low_latency(self):
+        """Включение low_latency режима USB-serial адаптера (только Linux)"""
+        if platform.system() != 'Linux':
+            return
+
+        # ASYNC_LOW_LATENCY via TIOCSSERIAL ioctl
+        try:
+            self.ser.set_low_latency_mode(True)
+            self.logger.debug(f"Low latency режим включен для {self.port}")
+            return
+        except (AttributeError, ValueError) as e:
+            ioctl_error = e
+
+        # Fallback: FTDI latency_timer in sysfs (default 16 ms)
+        tty = os.path.basename(os.path.realpath(self.port))
+        latency_timer = f"/sys/class/tty/{tty}/device/latency_timer"
+        try:
+            with open(latency_timer, 'w') as f:
+                f.write("1")
+            self.logger.debug(f"latency_timer=1ms установлен для {self.port}")
+        except OSError as e:
+            self.logger.warning(f"⚠️  Не удалось включить low latency для {self.port}: {ioctl_error}; {e}")
+
     def disconnect(self):
         """Отключение от UPS"""
         if self.ser and self.ser.is_open:
@@ -310,14 +444,14 @@ class UPSWebDaemon:
         if rc != 0:
             self.logger.warning(f"⚠️  Неожиданное отключение MQTT, код: {rc}")
     
-    def publish_mqtt(self, telemetry):
+    def publish_mqtt(self, telemetry_dict):
         """Публикация телеметрии в MQTT"""
         if not self.mqtt_client:
             return
         
         try:
-            payload = json.dumps(asdict(telemetry), ensure_ascii=False)
-            result = self.mqtt_client.publish(self.mqtt_topic, payload, qos=1)
+            payload = json_dumps_bytes(telemetry_dict)
+            result = self.mqtt_client.publish(self.mqtt_topic, payload, qos=self.mqtt_qos)
             
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
                 self.logger.debug(f"📤 MQTT: опубликовано в {self.mqtt_topic}")
@@ -376,7 +510,11 @@ class UPSWebDaemon:
             self.prom_input_voltage.set(telemetry.input_voltage)
             self.prom_output_voltage.set(telemetry.output_voltage)
             self.prom_battery_voltage.set(telemetry.battery_voltage)
-            self.prom_battery_level.labels(status=telemetry.status).set(telemetry.battery_level)
+            battery_level_gauge = self._status_labels.get(telemetry.status)
+            if battery_level_gauge is None:
+                battery_level_gauge = self.prom_battery_level.labels(status=telemetry.status)
+                self._status_labels[telemetry.status] = battery_level_gauge
+            battery_level_gauge.set(telemetry.battery_level)
             self.prom_load_percent.set(telemetry.load_percent)
             self.prom_load_power.set(telemetry.load_power)
             self.prom_frequency.set(telemetry.frequency)
@@ -391,9 +529,8 @@ class UPSWebDaemon:
             if telemetry.battery_time_remaining_minutes > 0:
                 self.prom_battery_time_remaining.set(telemetry.battery_time_remaining_minutes)
             
-            # Status: simple string value
-            status_str = "online" if telemetry.status == "online" else "on battery"
-            self.prom_status.set(1.0 if status_str == "online" else 0.0)
+            # Status: 1 = online, 0 = on battery
+            self.prom_status.set(1.0 if telemetry.status == "online" else 0.0)
             
             # Recent warnings count
             self.prom_warnings.set(len(self.recent_warnings))
@@ -404,13 +541,12 @@ class UPSWebDaemon:
         """Пробуждение UPS"""
         self.logger.debug("Пробуждение UPS...")
 
-        for hex_cmd in WAKEUP_COMMANDS:
+        for cmd in WAKEUP_CMD_BYTES:
             try:
-                cmd = bytes.fromhex(hex_cmd)
+                # No flush(): the blocking read below already waits for the reply
+                self.ser.reset_input_buffer()
                 self.ser.write(cmd)
-                self.ser.flush()
-                time.sleep(WAKEUP_DELAY)
-                self.ser.read(100)
+                self.read_response(cmd)
             except Exception as e:
                 self.logger.warning(f"Ошибка при пробуждении: {e}")
                 return False
@@ -418,15 +554,34 @@ class UPSWebDaemon:
         time.sleep(POST_WAKEUP_DELAY)
         return True
 
-    def send_command(self, hex_command, description=""):
+    def read_response(self, request):
+        """Чтение Modbus RTU ответа: длина берется из заголовка, без ожидания таймаута"""
+        # Address, function code, byte count
+        header = self.ser.read(3)
+        if len(header) < 3:
+            return header
+        # The byte count is only trustworthy in a reply to this request: a stray or
+        # late byte would otherwise shift every following frame
+        if header[0] != request[0] or header[1] & 0x7F != request[1]:
+            self.logger.warning(
+                f"Ответ не соответствует запросу (unit {header[0]:#04x}, "
+                f"function {header[1]:#04x}), ответ отброшен"
+            )
+            self.ser.reset_input_buffer()
+            return None
+        if header[1] & 0x80:
+            # Exception response: the third byte is the exception code, then CRC
+            return header + self.ser.read(2)
+        # Data bytes + CRC
+        return header + self.ser.read(header[2] + 2)
+
+    def send_command(self, cmd, description=""):
         """Отправка команды и чтение ответа"""
         try:
-            cmd = bytes.fromhex(hex_command)
+            # Drop stale input (late replies, RS-485 turnaround noise) before the request
+            self.ser.reset_input_buffer()
             self.ser.write(cmd)
-            self.ser.flush()
-            time.sleep(0.5)
-
-            response = self.ser.read(100)
+            response = self.read_response(cmd)
             return response if response else None
 
         except Exception as e:
@@ -442,48 +597,32 @@ class UPSWebDaemon:
             return self._parse_telemetry_legacy(data)
     
     def _parse_telemetry_legacy(self, data):
-        """Legacy parser using range matching"""
+        """Legacy parser using the fixed main parameters register layout"""
         telemetry = UPSTelemetry()
-        telemetry.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        telemetry.timestamp = f"{datetime.now():%Y-%m-%d %H:%M:%S}"
         telemetry.uptime = self.get_uptime()
 
         if len(data) < 5:
             return telemetry
 
-        payload = data[5:]
-
-        # Парсим как big-endian
-        values = []
-        for i in range(0, len(payload) - 1, 2):
-            values.append(struct.unpack_from('>H', payload, i)[0])
-
-        # Parse values using range matching
-        for val in values:
-            # Output voltage (220-230V) - first occurrence (output comes first in UPS data)
-            if VOLTAGE_RANGE[0] <= val <= VOLTAGE_RANGE[1] and telemetry.output_voltage == 0:
-                telemetry.output_voltage = val / 10.0
-            # Input voltage (220-230V) - second occurrence (input comes second in UPS data)
-            elif VOLTAGE_RANGE[0] <= val <= VOLTAGE_RANGE[1] and telemetry.output_voltage > 0:
-                telemetry.input_voltage = val / 10.0
-            # Frequency (49-51Hz)
-            elif FREQUENCY_RANGE[0] <= val <= FREQUENCY_RANGE[1]:
-                telemetry.frequency = val / 10.0
-                telemetry.input_frequency = val / 10.0
-            # Battery voltage (13-14V)
-            elif BATTERY_VOLTAGE_RANGE[0] <= val <= BATTERY_VOLTAGE_RANGE[1]:
-                telemetry.battery_voltage = val / 10.0
-            # Battery level (95-105%)
-            elif BATTERY_LEVEL_RANGE[0] <= val <= BATTERY_LEVEL_RANGE[1]:
-                telemetry.battery_level = val
-            # Load percentage (10-20%)
-            elif LOAD_PERCENT_RANGE[0] <= val <= LOAD_PERCENT_RANGE[1]:
-                telemetry.load_percent = val
-            # Load power (130-150W)
-            elif LOAD_POWER_RANGE[0] <= val <= LOAD_POWER_RANGE[1]:
-                telemetry.load_power = val
-            # Temperature (30-40°C)
-            elif TEMPERATURE_RANGE[0] <= val <= TEMPERATURE_RANGE[1]:
-                telemetry.temperature = val
+        # Все регистры за один вызов; короткие ответы дополняются нулями ("нет данных")
+        register_count = (len(data) - 5) // 2
+        if register_count >= MAIN_PARAMS_REGISTERS:
+            regs = MAIN_PARAMS_STRUCT.unpack_from(data, 5)
+        else:
+            regs = struct.unpack_from(f'>{register_count}H', data, 5)
+            regs += (0,) * (MAIN_PARAMS_REGISTERS - register_count)
+
+        telemetry.input_voltage = regs[REG_INPUT_VOLTAGE] / 10.0
+        telemetry.input_frequency = regs[REG_INPUT_FREQUENCY] / 10.0
+        telemetry.frequency = telemetry.input_frequency or regs[REG_OUTPUT_FREQUENCY] / 10.0
+        telemetry.output_voltage = regs[REG_OUTPUT_VOLTAGE] / 10.0
+        telemetry.load_power = regs[REG_LOAD_POWER]
+        telemetry.load_percent = regs[REG_LOAD_PERCENT]
+        telemetry.battery_voltage = regs[REG_BATTERY_VOLTAGE] / 10.0
+        telemetry.battery_level = regs[REG_BATTERY_LEVEL]
+        temperature = regs[REG_TEMPERATURE]
+        telemetry.temperature = temperature if temperature < 100 else temperature / 10.0
 
         # Determine status based on input voltage
         telemetry.status = "online" if telemetry.input_voltage > ONLINE_VOLTAGE_THRESHOLD else "battery"
@@ -511,10 +650,12 @@ class UPSWebDaemon:
             telemetry.status = modbus_telemetry.status
             
             # Log extended values if available
-            if modbus_telemetry.error_message and modbus_telemetry.error_message != "No errors":
-                self.logger.warning(f"UPS Error: {modbus_telemetry.error_message}")
-            if modbus_telemetry.warning_message and modbus_telemetry.warning_message != "No errors":
-                self.logger.warning(f"UPS Warning: {modbus_telemetry.warning_message}")
+            error_message = modbus_telemetry.error_message
+            if error_message and error_message != "No errors":
+                self.logger.warning(f"UPS Error: {error_message}")
+            warning_message = modbus_telemetry.warning_message
+            if warning_message and warning_message != "No errors":
+                self.logger.warning(f"UPS Warning: {warning_message}")
             
             return telemetry
         except Exception as e:
@@ -526,38 +667,22 @@ class UPSWebDaemon:
         """Получение полной телеметрии"""
         telemetry = UPSTelemetry()
 
-        # Get main parameters
-        response = self.send_command(UPS_COMMAND_MAIN_PARAMS, "основные параметры")
+        # Get main parameters (battery voltage and level included)
+        response = self.send_command(CMD_MAIN, "основные параметры")
         if response:
             telemetry = self.parse_telemetry(response)
 
-        # If battery data missing, try battery command
-        if telemetry.battery_voltage == 0:
-            battery_response = self.send_command(UPS_COMMAND_BATTERY, "батарея")
-            if battery_response:
-                battery_telemetry = self.parse_telemetry(battery_response)
-                if battery_telemetry.battery_voltage > 0:
-                    telemetry.battery_voltage = battery_telemetry.battery_voltage
-                if battery_telemetry.battery_level > 0:
-                    telemetry.battery_level = battery_telemetry.battery_level
-
         return telemetry
 
     def check_alarms(self, telemetry):
         """Проверка аварийных состояний"""
         alarms = []
 
-        if telemetry.input_voltage > 0 and telemetry.input_voltage < MIN_INPUT_VOLTAGE:
-            alarms.append("Низкое напряжение сети")
-
-        if telemetry.battery_level > 0 and telemetry.battery_level < MIN_BATTERY_LEVEL:
-            alarms.append("Низкий заряд батареи")
-
-        if telemetry.temperature > 0 and telemetry.temperature > MAX_TEMPERATURE:
-            alarms.append("Высокая температура")
-
-        if telemetry.load_percent > 0 and telemetry.load_percent > MAX_LOAD_PERCENT:
-            alarms.append("Высокая нагрузка")
+        for field, compare, threshold, message in ALARM_RULES:
+            value = getattr(telemetry, field)
+            # Zero means the value was not reported
+            if value > 0 and compare(value, threshold):
+                alarms.append(message)
 
         return alarms
     
@@ -568,6 +693,7 @@ class UPSWebDaemon:
         # Оставляем только последние max_warnings
         if len(self.recent_warnings) > self.max_warnings:
             self.recent_warnings = self.recent_warnings[-self.max_warnings:]
+        self.state_version += 1
 
     def monitoring_loop(self):
         """Цикл мониторинга UPS"""
@@ -579,14 +705,14 @@ class UPSWebDaemon:
                 if not self.ser or not self.ser.is_open:
                     if not self.connect():
                         self.logger.warning(f"Ожидание {CONNECTION_RETRY_DELAY} секунд перед повторной попыткой...")
-                        time.sleep(CONNECTION_RETRY_DELAY)
+                        self._stop_event.wait(CONNECTION_RETRY_DELAY)
                         continue
 
                 # Wake up UPS
                 if not self.wakeup_ups():
                     self.logger.error("Не удалось пробудить UPS, переподключаемся...")
                     self.disconnect()
-                    time.sleep(ERROR_RETRY_DELAY)
+                    self._stop_event.wait(ERROR_RETRY_DELAY)
                     continue
 
                 # Получение телеметрии
@@ -598,12 +724,16 @@ class UPSWebDaemon:
                     self.calculate_battery_state(telemetry)
                     
                     self.current_telemetry = telemetry
+                    self.current_telemetry_dict = telemetry.as_dict()
+                    alarms = self.check_alarms(telemetry)
+                    self.current_alarms = tuple(alarms)
+                    self.state_version += 1
 
                     # Обновление Prometheus метрик
                     self.update_prometheus_metrics(telemetry)
 
                     # Публикация в MQTT
-                    self.publish_mqtt(telemetry)
+                    self.publish_mqtt(self.current_telemetry_dict)
 
                     # Логирование
                     log_parts = [
@@ -633,7 +763,6 @@ class UPSWebDaemon:
                     self.logger.info(f"Телеметрия: {', '.join(log_parts)}")
 
                     # Проверка аварий
-                    alarms = self.check_alarms(telemetry)
                     for alarm in alarms:
                         warning_msg = f"Авария: {alarm}"
                         self.logger.warning(warning_msg)
@@ -646,106 +775,21 @@ class UPSWebDaemon:
                     # Переподключение при ошибке получения телеметрии
                     self.logger.info("Переподключение к UPS...")
                     self.disconnect()
-                    time.sleep(2)
+                    self._stop_event.wait(2)
 
-                # Ожидание до следующего опроса
-                for i in range(self.interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
+                # Ожидание до следующего опроса (прерывается по stop())
+                self._stop_event.wait(self.interval)
 
             except Exception as e:
                 self.logger.error(f"Ошибка в цикле мониторинга: {e}", exc_info=True)
                 self.disconnect()
-                time.sleep(ERROR_RETRY_DELAY)
-
-class UPSRequestHandler(BaseHTTPRequestHandler):
-    """Обработчик HTTP запросов"""
-
-    def __init__(self, *args, **kwargs):
-        self.daemon = kwargs.pop('daemon')
-        super().__init__(*args, **kwargs)
-
-    def log_message(self, format, *args):
-        self.daemon.logger.info(f"WEB {self.address_string()} - {format % args}")
-
-    def _safe_write(self, data):
-        """Safely write data to client, handling connection errors gracefully"""
-        try:
-            if isinstance(data, str):
-                self.wfile.write(data.encode())
-            else:
-                self.wfile.write(data)
-            self.wfile.flush()
-        except (BrokenPipeError, ConnectionResetError, OSError) as e:
-            # Client disconnected before we finished sending
-            # This is normal and not an error worth logging
-            self.daemon.logger.debug(f"Client disconnected during write: {type(e).__name__}")
-        except Exception as e:
-            self.daemon.logger.error(f"Unexpected error writing to client: {e}")
-
-    def do_GET(self):
-        try:
-            if self.path == '/':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-
-                telemetry = self.daemon.current_telemetry
-                alarms = self.daemon.check_alarms(telemetry)
-                warnings = self.daemon.recent_warnings
-
-                html = self.generate_html(telemetry, alarms, warnings)
-                self._safe_write(html)
-
-            elif self.path == '/api/telemetry':
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-
-                telemetry_dict = asdict(self.daemon.current_telemetry)
-                telemetry_dict['alarms'] = self.daemon.check_alarms(self.daemon.current_telemetry)
-                telemetry_dict['recent_warnings'] = self.daemon.recent_warnings
-                response = json.dumps(telemetry_dict, indent=2)
-                self._safe_write(response)
-
-            elif self.path == '/api/health':
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-
-                health = {
-                    'status': 'running',
-                    'uptime': self.daemon.get_uptime(),
-                    'timestamp': datetime.now().isoformat()
-                }
-                self._safe_write(json.dumps(health))
-
-            elif self.path == '/metrics':
-                self.send_response(200)
-                self.send_header('Content-type', CONTENT_TYPE_LATEST)
-                self.end_headers()
-                self._safe_write(generate_latest())
-
-            else:
-                self.send_response(404)
-                self.end_headers()
-                self._safe_write(b'404 Not Found')
-        except Exception as e:
-            self.daemon.logger.error(f"Error handling request {self.path}: {e}", exc_info=True)
-            try:
-                self.send_response(500)
-                self.end_headers()
-                self._safe_write(json.dumps({'error': 'Internal server error'}).encode())
-            except:
-                pass  # Client may have already disconnected
+                self._stop_event.wait(ERROR_RETRY_DELAY)
 
-    def generate_html(self, telemetry, alarms, warnings):
-        status_color = "green" if telemetry.status == "online" else "red"
-        status_text = "ONLINE" if telemetry.status == "online" else "BATTERY"
+# ============================================================================
+# Web page template (placeholders are filled by UPSRequestHandler.generate_html)
+# ============================================================================
 
-        return f"""
+HTML_TEMPLATE = string.Template("""
 <!DOCTYPE html>
 <html lang="ru">
 <head>
@@ -753,109 +797,109 @@ class UPSRequestHandler(BaseHTTPRequestHandler):
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>UPS Monitor</title>
     <style>
-        body {{
+        body {
             font-family: 'Arial', sans-serif;
             margin: 0;
             padding: 20px;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             min-height: 100vh;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             background: white;
             border-radius: 15px;
             box-shadow: 0 10px 30px rgba(0,0,0,0.2);
             overflow: hidden;
-        }}
-        .header {{
+        }
+        .header {
             background: #2c3e50;
             color: white;
             padding: 20px;
             text-align: center;
-        }}
-        .status {{
-            background: {status_color};
+        }
+        .status {
+            background: $status_color;
             color: white;
             padding: 10px;
             text-align: center;
             font-size: 1.2em;
             font-weight: bold;
-        }}
-        .grid {{
+        }
+        .grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
             gap: 20px;
             padding: 20px;
-        }}
-        .card {{
+        }
+        .card {
             background: #f8f9fa;
             border-radius: 10px;
             padding: 20px;
             text-align: center;
             border-left: 4px solid #3498db;
             transition: transform 0.3s;
-        }}
-        .card:hover {{
+        }
+        .card:hover {
             transform: translateY(-5px);
-        }}
-        .card h3 {{
+        }
+        .card h3 {
             margin: 0 0 10px 0;
             color: #2c3e50;
-        }}
-        .value {{
+        }
+        .value {
             font-size: 2em;
             font-weight: bold;
             color: #3498db;
-        }}
-        .unit {{
+        }
+        .unit {
             font-size: 0.8em;
             color: #7f8c8d;
-        }}
-        .alarms {{
+        }
+        .alarms {
             background: #e74c3c;
             color: white;
             padding: 15px;
             margin: 20px;
             border-radius: 10px;
-            display: {'' if alarms else 'none'};
-        }}
-        .warnings {{
+            display: $alarms_display;
+        }
+        .warnings {
             background: #f39c12;
             color: white;
             padding: 15px;
             margin: 20px;
             border-radius: 10px;
-        }}
-        .warnings h3 {{
+        }
+        .warnings h3 {
             margin-top: 0;
-        }}
-        .warning-item {{
+        }
+        .warning-item {
             padding: 5px 0;
             border-bottom: 1px solid rgba(255,255,255,0.3);
-        }}
-        .warning-item:last-child {{
+        }
+        .warning-item:last-child {
             border-bottom: none;
-        }}
-        .warning-time {{
+        }
+        .warning-time {
             font-size: 0.85em;
             opacity: 0.9;
-        }}
-        .footer {{
+        }
+        .footer {
             text-align: center;
             padding: 20px;
             color: #7f8c8d;
             border-top: 1px solid #ecf0f1;
-        }}
-        .battery {{
-            background: linear-gradient(90deg, #2ecc71 {telemetry.battery_level}%, #ecf0f1 {telemetry.battery_level}%);
+        }
+        .battery {
+            background: linear-gradient(90deg, #2ecc71 $battery_level%, #ecf0f1 $battery_level%);
             height: 30px;
             border-radius: 15px;
             margin: 10px 0;
             position: relative;
             border: 2px solid #34495e;
-        }}
-        .battery-level {{
+        }
+        .battery-level {
             position: absolute;
             top: 50%;
             left: 50%;
@@ -863,19 +907,19 @@ class UPSRequestHandler(BaseHTTPRequestHandler):
             font-weight: bold;
             color: #2c3e50;
             text-shadow: 1px 1px 2px white;
-        }}
-        .auto-refresh {{
+        }
+        .auto-refresh {
             text-align: center;
             padding: 10px;
             background: #ecf0f1;
-        }}
-        @keyframes fadeIn {{
-            from {{ opacity: 0; transform: translateY(20px); }}
-            to {{ opacity: 1; transform: translateY(0); }}
-        }}
-        .card {{
+        }
+        @keyframes fadeIn {
+            from { opacity: 0; transform: translateY(20px); }
+            to { opacity: 1; transform: translateY(0); }
+        }
+        .card {
             animation: fadeIn 0.5s ease-out;
-        }}
+        }
     </style>
 </head>
 <body>
@@ -886,62 +930,62 @@ class UPSRequestHandler(BaseHTTPRequestHandler):
         </div>
 
         <div class="status">
-            Status: {status_text} | Last Update: {telemetry.timestamp} | Uptime: {telemetry.uptime}
+            Status: $status_text | Last Update: $timestamp | Uptime: $uptime
         </div>
 
-        {''.join(f'<div class="alarms">🚨 {alarm}</div>' for alarm in alarms)}
+        $alarms_html
         
-        {f'<div class="warnings"><h3>⚠️ Recent Warnings (Last {len(warnings)})</h3>' + ''.join(f'<div class="warning-item"><span class="warning-time">{w["timestamp"]}</span> - {w["message"]}</div>' for w in warnings) + '</div>' if warnings else ''}
+        $warnings_html
 
         <div class="grid">
             <div class="card">
                 <h3>⚡ Input Voltage</h3>
-                <div class="value">{telemetry.input_voltage:.1f}<span class="unit">V</span></div>
+                <div class="value">$input_voltage<span class="unit">V</span></div>
             </div>
 
             <div class="card">
                 <h3>🔌 Output Voltage</h3>
-                <div class="value">{telemetry.output_voltage:.1f}<span class="unit">V</span></div>
+                <div class="value">$output_voltage<span class="unit">V</span></div>
             </div>
 
             <div class="card">
                 <h3>🔄 Frequency</h3>
-                <div class="value">{telemetry.frequency:.1f}<span class="unit">Hz</span></div>
+                <div class="value">$frequency<span class="unit">Hz</span></div>
             </div>
 
             <div class="card">
                 <h3>🔋 Battery Voltage</h3>
-                <div class="value">{telemetry.battery_voltage:.1f}<span class="unit">V</span></div>
+                <div class="value">$battery_voltage<span class="unit">V</span></div>
             </div>
 
             <div class="card">
                 <h3>📈 Battery Level</h3>
-                <div class="value">{telemetry.battery_level}<span class="unit">%</span></div>
+                <div class="value">$battery_level<span class="unit">%</span></div>
                 <div class="battery">
-                    <div class="battery-level">{telemetry.battery_level}%</div>
+                    <div class="battery-level">$battery_level%</div>
                 </div>
             </div>
 
             <div class="card">
                 <h3>💪 Load Power</h3>
-                <div class="value">{telemetry.load_power}<span class="unit">W</span></div>
+                <div class="value">$load_power<span class="unit">W</span></div>
             </div>
 
             <div class="card">
                 <h3>📊 Load Percentage</h3>
-                <div class="value">{telemetry.load_percent}<span class="unit">%</span></div>
+                <div class="value">$load_percent<span class="unit">%</span></div>
             </div>
 
             <div class="card">
                 <h3>🌡️ Temperature</h3>
-                <div class="value">{telemetry.temperature:.1f}<span class="unit">°C</span></div>
+                <div class="value">$temperature<span class="unit">°C</span></div>
             </div>
             
             <div class="card" style="border-left: 4px solid #e74c3c;">
                 <h3>⏱️ Battery Runtime</h3>
-                <div class="value">{int(telemetry.battery_time_remaining_hours)}<span class="unit">h</span> {int(telemetry.battery_time_remaining_minutes % 60)}<span class="unit">m</span></div>
+                <div class="value">$runtime_hours<span class="unit">h</span> $runtime_minutes<span class="unit">m</span></div>
                 <div style="font-size: 0.9em; color: #7f8c8d; margin-top: 10px;">
-                    SoC: {telemetry.battery_soc_percent:.1f}% | Current: {telemetry.battery_current_a:.2f}A
+                    SoC: $battery_soc% | Current: ${battery_current}A
                 </div>
             </div>
         </div>
@@ -954,7 +998,7 @@ class UPSRequestHandler(BaseHTTPRequestHandler):
         </div>
 
         <div class="footer">
-            <p> Data updates every {self.daemon.interval} seconds</p>
+            <p> Data updates every $interval seconds</p>
         </div>
     </div>
 
@@ -963,16 +1007,183 @@ class UPSRequestHandler(BaseHTTPRequestHandler):
         setTimeout(() => location.reload(), 10000);
 
         // Add animations
-        document.addEventListener('DOMContentLoaded', function() {{
+        document.addEventListener('DOMContentLoaded', function() {
             const cards = document.querySelectorAll('.card');
-            cards.forEach((card, index) => {{
+            cards.forEach((card, index) => {
                 card.style.animationDelay = (index * 0.1) + 's';
-            }});
-        }});
+            });
+        });
     </script>
 </body>
 </html>
-"""
+""")
+
+class UPSRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP запросов"""
+
+    # Keep-alive: Prometheus and auto-refreshing browsers reuse one connection
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections are closed after this many seconds, so they
+    # don't pin a ThreadingHTTPServer thread in readline() forever; longer than
+    # the dashboard refresh (10 s) and typical Prometheus scrape intervals
+    timeout = 120
+    # Headers and body go out in separate writes: without TCP_NODELAY the body
+    # waits for the client's delayed ACK on every reused connection
+    disable_nagle_algorithm = True
+
+    def __init__(self, *args, **kwargs):
+        self.daemon = kwargs.pop('daemon')
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        self.daemon.logger.info(f"WEB {self.address_string()} - {format % args}")
+
+    def log_error(self, format, *args):
+        # Idle keep-alive timeouts and malformed requests are routine, not errors
+        self.daemon.logger.debug(f"WEB {self.address_string()} - {format % args}")
+
+    def _safe_write(self, data):
+        """Safely write data to client, handling connection errors gracefully"""
+        try:
+            if isinstance(data, str):
+                self.wfile.write(data.encode())
+            else:
+                self.wfile.write(data)
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            # Client disconnected before we finished sending
+            # This is normal and not an error worth logging
+            self.daemon.logger.debug(f"Client disconnected during write: {type(e).__name__}")
+        except Exception as e:
+            self.daemon.logger.error(f"Unexpected error writing to client: {e}")
+
+    def _accepts_gzip(self):
+        """True if Accept-Encoding allows gzip (explicitly or via *) with a non-zero q-value"""
+        gzip_q = None
+        wildcard_q = None
+        for token in self.headers.get('Accept-Encoding', '').split(','):
+            coding, _, params = token.partition(';')
+            coding = coding.strip().lower()
+            q = 1.0
+            for param in params.split(';'):
+                name, _, value = param.partition('=')
+                if name.strip().lower() == 'q':
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            if coding in ('gzip', 'x-gzip'):
+                gzip_q = q
+            elif coding == '*':
+                wildcard_q = q
+        if gzip_q is None:
+            gzip_q = wildcard_q
+        return gzip_q is not None and gzip_q > 0
+
+    def _send_body(self, status, content_type, body, headers=None):
+        """Send a complete response; Content-Length lets HTTP/1.1 clients keep the connection open"""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self._safe_write(body)
+
+    def do_GET(self):
+        try:
+            if self.path == '/':
+                html, html_gzip = self._get_html()
+                if self._accepts_gzip():
+                    self._send_body(200, 'text/html', html_gzip,
+                                    {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+                else:
+                    self._send_body(200, 'text/html', html, {'Vary': 'Accept-Encoding'})
+
+            elif self.path == '/api/telemetry':
+                self._send_body(200, 'application/json', self._get_telemetry_json(),
+                                {'Access-Control-Allow-Origin': '*'})
+
+            elif self.path == '/api/health':
+                health = {
+                    'status': 'running',
+                    'uptime': self.daemon.get_uptime(),
+                    'timestamp': datetime.now().isoformat()
+                }
+                self._send_body(200, 'application/json', json_dumps_bytes(health))
+
+            elif self.path == '/metrics':
+                self._send_body(200, CONTENT_TYPE_LATEST, generate_latest())
+
+            else:
+                self._send_body(404, 'text/plain', b'404 Not Found')
+        except Exception as e:
+            self.daemon.logger.error(f"Error handling request {self.path}: {e}", exc_info=True)
+            try:
+                self._send_body(500, 'application/json', json.dumps({'error': 'Internal server error'}).encode())
+            except:
+                pass  # Client may have already disconnected
+
+    def _get_html(self):
+        """Rendered page bytes and their gzip form, rebuilt only after telemetry or warnings change"""
+        version = self.daemon.state_version
+        cached_version, html, html_gzip = self.daemon._html_cache
+        if cached_version != version:
+            telemetry = self.daemon.current_telemetry
+            alarms = self.daemon.current_alarms
+            warnings = self.daemon.recent_warnings
+            html = self.generate_html(telemetry, alarms, warnings).encode()
+            html_gzip = gzip.compress(html, compresslevel=6)
+            self.daemon._html_cache = (version, html, html_gzip)
+        return html, html_gzip
+
+    def _get_telemetry_json(self):
+        """/api/telemetry response bytes, re-serialized only after telemetry or warnings change"""
+        version = self.daemon.state_version
+        cached_version, response = self.daemon._telemetry_json_cache
+        if cached_version != version:
+            telemetry_dict = dict(self.daemon.current_telemetry_dict)
+            telemetry_dict['alarms'] = self.daemon.current_alarms
+            telemetry_dict['recent_warnings'] = self.daemon.recent_warnings
+            response = json_dumps_bytes(telemetry_dict)
+            self.daemon._telemetry_json_cache = (version, response)
+        return response
+
+    def generate_html(self, telemetry, alarms, warnings):
+        status_color = "green" if telemetry.status == "online" else "red"
+        status_text = "ONLINE" if telemetry.status == "online" else "BATTERY"
+
+        alarms_html = ''.join(f'<div class="alarms">🚨 {alarm}</div>' for alarm in alarms)
+        warnings_html = ''
+        if warnings:
+            warnings_html = (
+                f'<div class="warnings"><h3>⚠️ Recent Warnings (Last {len(warnings)})</h3>'
+                + ''.join(f'<div class="warning-item"><span class="warning-time">{w["timestamp"]}</span> - {w["message"]}</div>' for w in warnings)
+                + '</div>'
+            )
+
+        return HTML_TEMPLATE.substitute(
+            status_color=status_color,
+            status_text=status_text,
+            alarms_display='' if alarms else 'none',
+            alarms_html=alarms_html,
+            warnings_html=warnings_html,
+            timestamp=telemetry.timestamp,
+            uptime=telemetry.uptime,
+            input_voltage=f"{telemetry.input_voltage:.1f}",
+            output_voltage=f"{telemetry.output_voltage:.1f}",
+            frequency=f"{telemetry.frequency:.1f}",
+            battery_voltage=f"{telemetry.battery_voltage:.1f}",
+            battery_level=telemetry.battery_level,
+            load_power=telemetry.load_power,
+            load_percent=telemetry.load_percent,
+            temperature=f"{telemetry.temperature:.1f}",
+            runtime_hours=int(telemetry.battery_time_remaining_hours),
+            runtime_minutes=int(telemetry.battery_time_remaining_minutes % 60),
+            battery_soc=f"{telemetry.battery_soc_percent:.1f}",
+            battery_current=f"{telemetry.battery_current_a:.2f}",
+            interval=self.daemon.interval,
+        )
 
 def load_config(config_path=None):
     """Загрузка конфигурации из YAML файла"""
@@ -984,20 +1195,20 @@ def load_config(config_path=None):
             os.path.expanduser('~/.ups_monitor/config.yaml'),
             '/etc/ups_monitor/config.yaml'
         ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
-    
-    if config_path and os.path.exists(config_path):
+    else:
+        possible_paths = [config_path]
+
+    for path in possible_paths:
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f) or {}
-            return config
+            # Binary stream goes straight to the YAML reader, no text decoding layer
+            with open(path, 'rb') as f:
+                return yaml.load(f, Loader=YamlLoader) or {}
+        except FileNotFoundError:
+            continue
         except Exception as e:
-            print(f"⚠️  Ошибка чтения конфига {config_path}: {e}")
+            print(f"⚠️  Ошибка чтения конфига {path}: {e}")
             return {}
-    
+
     return {}
 
 def get_config_value(config, *keys, default=None):
@@ -1013,7 +1224,9 @@ def get_config_value(config, *keys, default=None):
 def start_web_server(daemon, port=8080):
     """Запуск веб-сервера в отдельном потоке"""
     handler = lambda *args, **kwargs: UPSRequestHandler(*args, daemon=daemon, **kwargs)
-    server = HTTPServer(('0.0.0.0', port), handler)
+    # One thread per request so a slow client never blocks /metrics scrapes
+    server = ThreadingHTTPServer(('0.0.0.0', port), handler)
+    server.daemon_threads = True
     
     # Store server reference in daemon for shutdown
     daemon.web_server = server
@@ -1070,6 +1283,7 @@ def main():
     parser.add_argument('--mqtt-topic', help='MQTT topic')
     parser.add_argument('--mqtt-username', help='MQTT username')
     parser.add_argument('--mqtt-password', help='MQTT password')
+    parser.add_argument('--mqtt-qos', type=int, choices=[0, 1, 2], help='MQTT QoS level for telemetry')
     parser.add_argument('--use-modbus-parser', action='store_true', 
                        help='Use experimental Modbus parser (requires ups_modbus_parser.py)')
     
@@ -1103,6 +1317,18 @@ def main():
     mqtt_topic = args.mqtt_topic or get_config_value(config, 'mqtt', 'topic', default='ups/telemetry')
     mqtt_username = args.mqtt_username or get_config_value(config, 'mqtt', 'username')
     mqtt_password = args.mqtt_password or get_config_value(config, 'mqtt', 'password')
+    mqtt_qos = args.mqtt_qos
+    if mqtt_qos is None:
+        # --mqtt-qos is checked by argparse; the config value has to be checked here,
+        # otherwise paho rejects it on every publish and MQTT silently stops
+        config_qos = get_config_value(config, 'mqtt', 'qos', default=0)
+        try:
+            mqtt_qos = int(str(config_qos).strip())
+        except ValueError:
+            mqtt_qos = None
+        if mqtt_qos not in (0, 1, 2):
+            print(f"❌ Неверное значение mqtt.qos в конфиге: {config_qos!r} (допустимо 0, 1 или 2)")
+            sys.exit(1)
     
     # Настройки логирования
     log_level_str = get_config_value(config, 'logging', 'level', default='INFO')
@@ -1133,6 +1359,7 @@ def main():
     if mqtt_broker:
         print(f"   MQTT broker: {mqtt_broker}:{mqtt_port}")
         print(f"   MQTT topic: {mqtt_topic}")
+        print(f"   MQTT QoS: {mqtt_qos}")
     else:
         print(f"   MQTT: disabled")
     print(f"   Log level: {log_level_str}")
@@ -1145,7 +1372,8 @@ def main():
                          mqtt_username, mqtt_password,
                          log_level, log_file, log_console, max_errors,
                          use_modbus_parser,
-                         battery_ah, inverter_eff, peukert_k)
+                         battery_ah, inverter_eff, peukert_k,
+                         mqtt_qos=mqtt_qos)
 
     # Запуск мониторинга в отдельном потоке
     monitor_thread = threading.Thread(target=daemon.monitoring_loop, daemon=True)
@@ -1156,15 +1384,14 @@ def main():
     
     try:
         # Основной поток ждет завершения или сигнала
-        while daemon.running:
-            time.sleep(0.5)
+        daemon.wait_for_stop()
     except KeyboardInterrupt:
         daemon.logger.info("Получен KeyboardInterrupt")
-        daemon.running = False
+        daemon.stop()
     finally:
         # Завершение работы
         daemon.logger.info("Завершение работы демона...")
-        daemon.running = False
+        daemon.stop()
         
         # Stop web server (must be called from different thread)
         if daemon.web_server:
@@ -1198,5 +1425,8 @@ def main():
         daemon.disconnect()
         daemon.logger.info("👋 UPS Web Daemon завершил работу")
 
+        # Flush queued log records
+        daemon.log_listener.stop()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Тесты последовательного протокола без железа: чтение Modbus RTU ответа
+(read_response / send_command) и legacy-парсер с фиксированными смещениями
+"""
+
+import struct
+import unittest
+
+import mustmon
+from mustmon import (
+    CMD_MAIN, MAIN_PARAMS_REGISTERS, UPSWebDaemon, crc16_modbus,
+)
+
+
+class FakeSerial:
+    """Serial port stand-in: write() queues the prepared reply into the input buffer"""
+
+    def __init__(self, reply=b"", stray=b""):
+        self.buffer = bytearray(stray)
+        self.reply = reply
+        self.written = []
+
+    def reset_input_buffer(self):
+        self.buffer.clear()
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        self.buffer += self.reply
+
+    def read(self, size=1):
+        chunk = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return chunk
+
+
+def make_frame(payload):
+    """Append the Modbus CRC (little-endian) to a frame"""
+    return payload + struct.pack('<H', crc16_modbus(payload))
+
+
+def setUpModule():
+    # The daemon registers its Prometheus metrics globally, so one instance is shared
+    global daemon
+    daemon = UPSWebDaemon('/dev/null', log_file=None, log_console=False)
+
+
+class ReadResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.daemon = daemon
+
+    def test_good_reply(self):
+        reply = make_frame(bytes([CMD_MAIN[0], CMD_MAIN[1], 4, 0x01, 0x02, 0x03, 0x04]))
+        self.daemon.ser = FakeSerial(reply + b"\xff")
+        self.assertEqual(self.daemon.send_command(CMD_MAIN), reply)
+        self.assertEqual(self.daemon.ser.written, [CMD_MAIN])
+        # Длина берется из заголовка: лишние байты не дочитываются
+        self.assertEqual(bytes(self.daemon.ser.buffer), b"\xff")
+
+    def test_stray_byte_before_reply(self):
+        reply = make_frame(bytes([CMD_MAIN[0], CMD_MAIN[1], 2, 0x00, 0x01]))
+        self.daemon.ser = FakeSerial()
+        self.daemon.ser.reply = b"\x00" + reply
+        self.assertIsNone(self.daemon.send_command(CMD_MAIN))
+        # Сдвинутый кадр отброшен целиком, а не оставлен для следующего опроса
+        self.assertEqual(len(self.daemon.ser.buffer), 0)
+
+    def test_stale_input_is_dropped_before_request(self):
+        reply = make_frame(bytes([CMD_MAIN[0], CMD_MAIN[1], 2, 0x00, 0x01]))
+        self.daemon.ser = FakeSerial(reply, stray=b"\x00\x00\x00")
+        self.assertEqual(self.daemon.send_command(CMD_MAIN), reply)
+
+    def test_exception_reply(self):
+        reply = make_frame(bytes([CMD_MAIN[0], CMD_MAIN[1] | 0x80, 0x02]))
+        self.daemon.ser = FakeSerial(reply + b"\xff")
+        self.assertEqual(self.daemon.send_command(CMD_MAIN), reply)
+        self.assertEqual(bytes(self.daemon.ser.buffer), b"\xff")
+
+    def test_no_reply(self):
+        self.daemon.ser = FakeSerial()
+        self.assertIsNone(self.daemon.send_command(CMD_MAIN))
+
+
+class LegacyParserTest(unittest.TestCase):
+    def setUp(self):
+        self.daemon = daemon
+
+    @staticmethod
+    def make_data(registers):
+        return b"\x0a\x03\x36\x00\x00" + struct.pack(f'>{len(registers)}H', *registers)
+
+    def test_full_frame(self):
+        registers = [0] * MAIN_PARAMS_REGISTERS
+        registers[mustmon.REG_INPUT_VOLTAGE] = 2301
+        registers[mustmon.REG_INPUT_FREQUENCY] = 500
+        registers[mustmon.REG_OUTPUT_VOLTAGE] = 2299
+        registers[mustmon.REG_LOAD_POWER] = 350
+        registers[mustmon.REG_LOAD_PERCENT] = 12
+        registers[mustmon.REG_BATTERY_VOLTAGE] = 271
+        registers[mustmon.REG_BATTERY_LEVEL] = 95
+        registers[mustmon.REG_TEMPERATURE] = 315
+        telemetry = self.daemon._parse_telemetry_legacy(self.make_data(registers))
+
+        self.assertEqual(telemetry.input_voltage, 230.1)
+        self.assertEqual(telemetry.input_frequency, 50.0)
+        self.assertEqual(telemetry.frequency, 50.0)
+        self.assertEqual(telemetry.output_voltage, 229.9)
+        self.assertEqual(telemetry.load_power, 350)
+        self.assertEqual(telemetry.load_percent, 12)
+        self.assertEqual(telemetry.battery_voltage, 27.1)
+        self.assertEqual(telemetry.battery_level, 95)
+        self.assertEqual(telemetry.temperature, 31.5)
+        self.assertEqual(telemetry.status, "online")
+
+    def test_output_frequency_fallback_on_battery(self):
+        registers = [0] * MAIN_PARAMS_REGISTERS
+        registers[mustmon.REG_OUTPUT_FREQUENCY] = 499
+        registers[mustmon.REG_TEMPERATURE] = 28
+        telemetry = self.daemon._parse_telemetry_legacy(self.make_data(registers))
+
+        self.assertEqual(telemetry.frequency, 49.9)
+        self.assertEqual(telemetry.temperature, 28)
+        self.assertEqual(telemetry.status, "battery")
+
+    def test_short_frame_is_zero_padded(self):
+        # Только регистры 0..6: остальные поля "нет данных"
+        registers = [0] * 7
+        registers[mustmon.REG_INPUT_VOLTAGE] = 2200
+        registers[mustmon.REG_OUTPUT_VOLTAGE] = 2210
+        telemetry = self.daemon._parse_telemetry_legacy(self.make_data(registers))
+
+        self.assertEqual(telemetry.input_voltage, 220.0)
+        self.assertEqual(telemetry.output_voltage, 221.0)
+        self.assertEqual(telemetry.load_power, 0)
+        self.assertEqual(telemetry.battery_level, 0)
+        self.assertEqual(telemetry.temperature, 0)
+
+    def test_header_only(self):
+        telemetry = self.daemon._parse_telemetry_legacy(b"\x0a\x03")
+        self.assertEqual(telemetry.input_voltage, mustmon.UPSTelemetry().input_voltage)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,10 @@ Based on register-based protocol parsing approach
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+import struct
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from dataclasses import dataclass
 
 _LOGGER = logging.getLogger(__name__)
@@ -25,226 +28,285 @@ CHARGER_WARNING = [None] * 128
 # INVERTER_ERROR[1] = "Undervoltage"
 # etc.
 
+
+def build_error_map(error_codes: List[Optional[str]]) -> Dict[int, str]:
+    """Map bit index -> message for the filled-in slots of an error code list."""
+    return {index: message for index, message in enumerate(error_codes) if message}
+
+
+# Built once at import from the lists above: error_bits only looks up bits that are set
+INVERTER_ERROR_MAP = build_error_map(INVERTER_ERROR)
+INVERTER_WARNING_MAP = build_error_map(INVERTER_WARNING)
+CHARGER_ERROR_MAP = build_error_map(CHARGER_ERROR)
+CHARGER_WARNING_MAP = build_error_map(CHARGER_WARNING)
+
+INVERTER_ERROR_REGISTERS = len(INVERTER_ERROR) // 16
+INVERTER_WARNING_REGISTERS = len(INVERTER_WARNING) // 16
+CHARGER_ERROR_REGISTERS = len(CHARGER_ERROR) // 16
+CHARGER_WARNING_REGISTERS = len(CHARGER_WARNING) // 16
+
 # ============================================================================
-# Conversion functions
+# Register addresses shared by the telemetry converters and the full maps
 # ============================================================================
 
-def int16(address: int, registers: Dict[int, int]) -> int:
-    """Convert signed 16-bit integer from register."""
-    if address not in registers:
-        return 0
-    val = registers[address]
-    bits = 16
-    if (val & (1 << (bits - 1))) != 0:  # if sign bit is set
-        val = val - (1 << bits)  # compute negative value
-    return val
+# partArr6 (main inverter data)
+ADDR_WORK_STATE = 25201
+ADDR_INVERTER_BATTERY_VOLTAGE = 25205
+ADDR_INVERTER_VOLTAGE = 25206  # Output voltage (to load)
+ADDR_GRID_VOLTAGE = 25207  # Input voltage (from grid/network)
+ADDR_BUS_VOLTAGE = 25208
+ADDR_INVERTER_CURRENT = 25210
+ADDR_GRID_CURRENT = 25211
+ADDR_LOAD_CURRENT = 25212
+ADDR_P_INVERTER = 25213
+ADDR_P_GRID = 25214
+ADDR_P_LOAD = 25215  # Load power
+ADDR_LOAD_PERCENT = 25216
+ADDR_GRID_FREQUENCY = 25226
+ADDR_AC_RADIATOR_TEMPERATURE = 25233
+ADDR_TRANSFORMER_TEMPERATURE = 25234
+ADDR_DC_RADIATOR_TEMPERATURE = 25235
+ADDR_INVERTER_ERROR = 25261
+ADDR_INVERTER_WARNING = 25265
+
+# partArr3 (charger data)
+ADDR_CHARGER_BATTERY_VOLTAGE = 15206
+ADDR_CHARGER_RADIATOR_TEMPERATURE = 15209
 
+# ============================================================================
+# Register storage
+# ============================================================================
 
-def uint16(address: int, registers: Dict[int, int]) -> int:
-    """Convert unsigned 16-bit integer from register."""
-    if address not in registers:
-        return 0
-    return registers[address]
+class RegisterBank:
+    """
+    Contiguous block of 16-bit registers starting at a base address.
+    Lookups are index arithmetic on a tuple instead of dict hashing.
+    """
+    __slots__ = ('base', 'values', 'count')
 
+    def __init__(self, base: int, values: Tuple[int, ...]):
+        self.base = base
+        self.values = values
+        self.count = len(values)
 
-def version(address: int, registers: Dict[int, int]) -> str:
-    """Convert version number from register."""
-    if address not in registers:
-        return "0.0.0"
-    val = registers[address]
-    return f"{val // 10000}.{(val // 100) % 100}.{val % 100}"
+    def __len__(self) -> int:
+        return self.count
 
+    def __contains__(self, address: int) -> bool:
+        return 0 <= address - self.base < self.count
 
-def accumulated_kwh(address: int, registers: Dict[int, int]) -> float:
-    """Convert accumulated kWh from two registers."""
-    if address not in registers or address + 1 not in registers:
-        return 0.0
-    return registers[address] * 1000 + registers[address + 1] * 0.1
+    def __getitem__(self, address: int) -> int:
+        index = address - self.base
+        if 0 <= index < self.count:
+            return self.values[index]
+        raise KeyError(address)
 
+    def get(self, address: int, default: Optional[int] = None) -> Optional[int]:
+        index = address - self.base
+        if 0 <= index < self.count:
+            return self.values[index]
+        return default
 
-def time_seconds(address: int, registers: Dict[int, int]) -> int:
-    """Convert time from three registers (hours, minutes, seconds)."""
-    if address not in registers or address + 1 not in registers or address + 2 not in registers:
-        return 0
-    return int(registers[address]) * 60 * 60 + int(registers[address + 1]) * 60 + int(registers[address + 2])
+    def window(self, address: int, length: int) -> Optional[Tuple[int, ...]]:
+        """Adjacent registers address..address+length-1 in one slice, None unless all are present."""
+        index = address - self.base
+        if index < 0 or index + length > self.count:
+            return None
+        return self.values[index:index + length]
 
 
-def serial_number(address: int, registers: Dict[int, int]) -> int:
-    """Convert serial number from two registers."""
-    if address not in registers or address + 1 not in registers:
+# ============================================================================
+# Conversion functions
+# ============================================================================
+
+def int16(address: int, registers: RegisterBank) -> int:
+    """Convert signed 16-bit integer from register."""
+    val = registers.get(address)
+    if val is None:
         return 0
-    return registers[address] << 16 | registers[address + 1]
+    # Two's complement without a sign-bit branch
+    return ((val & 0xFFFF) ^ 0x8000) - 0x8000
 
 
-def model(address: int, registers: Dict[int, int]) -> str:
-    """Convert model string from registers."""
-    if address not in registers or address + 1 not in registers:
-        return ""
-    a = chr(registers[address] >> 8 & 0xFF)
-    b = chr(registers[address] & 0xFF)
-    return f"{a}{b}{registers[address + 1]}"
+def uint16(address: int, registers: RegisterBank) -> int:
+    """Convert unsigned 16-bit integer from register."""
+    return registers.get(address, 0)
+
+
+def accumulated_kwh(address: int, registers: RegisterBank) -> float:
+    """Convert accumulated kWh from two registers."""
+    window = registers.window(address, 2)
+    if window is None:
+        return 0.0
+    high, low = window
+    return high * 1000 + low * 0.1
 
 
-def error_bits(address: int, registers: Dict[int, int], error_codes: List[Optional[str]]) -> str:
-    """Parse error bits from registers."""
+def time_seconds(address: int, registers: RegisterBank) -> int:
+    """Convert time from three registers (hours, minutes, seconds)."""
+    window = registers.window(address, 3)
+    if window is None:
+        return 0
+    hours, minutes, seconds = window
+    return hours * 60 * 60 + minutes * 60 + seconds
+
+
+def _error_messages(error_registers: Tuple[int, ...], error_map: Dict[int, str]) -> Iterator[str]:
+    """Yield the message for every set bit, register by register, lowest bit first."""
+    for i, mask in enumerate(error_registers):
+        # Visit only the set bits: zero registers cost one test
+        while mask:
+            bit = mask & -mask
+            error_index = i * 16 + bit.bit_length() - 1
+            mask ^= bit
+            message = error_map.get(error_index)
+            if message:
+                _LOGGER.debug("Error code %s found: %s", error_index, message)
+                yield message
+            else:
+                yield f"Unknown error bit {error_index}"
+
+
+def error_bits(address: int, registers: RegisterBank, error_map: Dict[int, str],
+               number_of_registers: int) -> str:
+    """Parse error bits from registers (error_map as built by build_error_map)."""
     if address not in registers:
         return "No errors"
     
-    number_of_registers = len(error_codes) // 16
-    errors_found = []
-
-    for i in range(number_of_registers):
-        reg_addr = address + i
-        if reg_addr not in registers:
-            continue
-        for j in range(16):
-            if registers[reg_addr] & (1 << j):
-                error_index = i * 16 + j
-                if error_index < len(error_codes) and error_codes[error_index]:
-                    _LOGGER.debug("Error code %s found: %s", error_index, error_codes[error_index])
-                    errors_found.append(error_codes[error_index])
-                else:
-                    errors_found.append(f"Unknown error bit {error_index}")
-
-    if len(errors_found) == 0:
+    start = address - registers.base
+    error_registers = registers.values[start:start + number_of_registers]
+    # Common case: every error register is zero, one C-level pass over the slice
+    if not any(error_registers):
         return "No errors"
 
-    _LOGGER.debug("Errors found: %s", errors_found)
-    return ", ".join(errors_found)
+    # At least one bit is set here, so the joined string is never empty
+    errors = ", ".join(_error_messages(error_registers, error_map))
+    _LOGGER.debug("Errors found: %s", errors)
+    return errors
 
 
 # ============================================================================
 # Data conversion functions
 # ============================================================================
 
-def convert_registers_to_dict(data: bytes, start_address: int = 0) -> Dict[int, int]:
+@lru_cache(maxsize=64)
+def _register_struct(count: int) -> struct.Struct:
+    """Compiled big-endian layout for count registers (frame lengths repeat, so compile once)"""
+    return struct.Struct(f'>{count}H')
+
+
+def decode_registers(data: bytes) -> Tuple[int, ...]:
     """
-    Convert raw bytes to register dictionary.
+    Decode raw bytes to a tuple of register values.
     Assumes big-endian 16-bit registers.
     """
-    registers = {}
     if len(data) < 2:
-        return registers
+        return ()
     
     # Skip header if present (first 5 bytes)
     offset = 5 if len(data) > 5 else 0
-    payload = data[offset:]
+    count = (len(data) - offset) // 2
     
-    for i in range(0, len(payload) - 1, 2):
-        register_address = start_address + (i // 2)
-        value = int.from_bytes(payload[i:i+2], byteorder='big', signed=False)
-        registers[register_address] = value
-    
-    return registers
+    # All registers decoded in a single C-level call
+    return _register_struct(count).unpack_from(data, offset)
 
 
-def convert_partArr6(registers: Dict[int, int]) -> Dict[str, Any]:
+def decode_partArr6(registers: RegisterBank) -> Dict[str, Any]:
     """
-    Convert partArr6 registers (main inverter data).
-    Addresses starting from 25201.
+    Full partArr6 register map (main inverter data), addresses starting from 25201.
+    For diagnostics and new fields; the telemetry itself uses convert_partArr6.
     """
     if not registers:
         return {}
     
     result = {}
-    try:
-        result["WorkState"] = int16(25201, registers)
-        result["AcVoltageGrade"] = int16(25202, registers)
-        result["RatedPower"] = int16(25203, registers)
-        result["InverterBatteryVoltage"] = int16(25205, registers) / 10.0  # Divide by 10 for voltage
-        result["InverterVoltage"] = int16(25206, registers) / 10.0
-        result["GridVoltage"] = int16(25207, registers) / 10.0  # Input voltage
-        result["BusVoltage"] = int16(25208, registers) / 10.0
-        result["ControlCurrent"] = int16(25209, registers) / 10.0
-        result["InverterCurrent"] = int16(25210, registers) / 10.0
-        result["GridCurrent"] = int16(25211, registers) / 10.0
-        result["LoadCurrent"] = int16(25212, registers) / 10.0
-        result["PInverter"] = int16(25213, registers)
-        result["PGrid"] = int16(25214, registers)
-        result["PLoad"] = int16(25215, registers)  # Load power
-        result["LoadPercent"] = int16(25216, registers)
-        result["SInverter"] = int16(25217, registers)
-        result["SGrid"] = int16(25218, registers)
-        result["Sload"] = int16(25219, registers)
-        result["Qinverter"] = int16(25221, registers)
-        result["Qgrid"] = int16(25222, registers)
-        result["Qload"] = int16(25223, registers)
-        result["InverterFrequency"] = int16(25225, registers) / 10.0  # Divide by 10 for frequency
-        result["GridFrequency"] = int16(25226, registers) / 10.0
-        result["InverterMaxNumber"] = uint16(25229, registers)
-        result["CombineType"] = uint16(25230, registers)
-        result["InverterNumber"] = uint16(25231, registers)
-        result["AcRadiatorTemperature"] = int16(25233, registers)
-        result["TransformerTemperature"] = int16(25234, registers)
-        result["DcRadiatorTemperature"] = int16(25235, registers)
-        result["InverterRelayState"] = int16(25237, registers)
-        result["GridRelayState"] = int16(25238, registers)
-        result["LoadRelayState"] = int16(25239, registers)
-        result["N_LineRelayState"] = int16(25240, registers)
-        result["DCRelayState"] = int16(25241, registers)
-        result["EarthRelayState"] = int16(25242, registers)
-        result["AccumulatedChargerPower"] = accumulated_kwh(25245, registers)
-        result["AccumulatedDischargerPower"] = accumulated_kwh(25247, registers)
-        result["AccumulatedBuyPower"] = accumulated_kwh(25249, registers)
-        result["AccumulatedSellPower"] = accumulated_kwh(25251, registers)
-        result["AccumulatedLoadPower"] = accumulated_kwh(25253, registers)
-        result["AccumulatedSelfUsePower"] = accumulated_kwh(25255, registers)
-        result["AccumulatedPvSellPower"] = accumulated_kwh(25257, registers)
-        result["AccumulatedGridChargerPower"] = accumulated_kwh(25259, registers)
-        result["InverterErrorMessage"] = error_bits(25261, registers, INVERTER_ERROR)
-        result["InverterWarningMessage"] = error_bits(25265, registers, INVERTER_WARNING)
-        result["BattPower"] = int16(25273, registers)
-        result["BattCurrent"] = int16(25274, registers) / 10.0
-        result["RatedPowerW"] = int16(25277, registers)
-    except Exception as e:
-        _LOGGER.error(f"Error converting partArr6: {e}")
-    
+    result["WorkState"] = int16(ADDR_WORK_STATE, registers)
+    result["AcVoltageGrade"] = int16(25202, registers)
+    result["RatedPower"] = int16(25203, registers)
+    result["InverterBatteryVoltage"] = int16(ADDR_INVERTER_BATTERY_VOLTAGE, registers) / 10.0  # Divide by 10 for voltage
+    result["InverterVoltage"] = int16(ADDR_INVERTER_VOLTAGE, registers) / 10.0
+    result["GridVoltage"] = int16(ADDR_GRID_VOLTAGE, registers) / 10.0  # Input voltage
+    result["BusVoltage"] = int16(ADDR_BUS_VOLTAGE, registers) / 10.0
+    result["ControlCurrent"] = int16(25209, registers) / 10.0
+    result["InverterCurrent"] = int16(ADDR_INVERTER_CURRENT, registers) / 10.0
+    result["GridCurrent"] = int16(ADDR_GRID_CURRENT, registers) / 10.0
+    result["LoadCurrent"] = int16(ADDR_LOAD_CURRENT, registers) / 10.0
+    result["PInverter"] = int16(ADDR_P_INVERTER, registers)
+    result["PGrid"] = int16(ADDR_P_GRID, registers)
+    result["PLoad"] = int16(ADDR_P_LOAD, registers)  # Load power
+    result["LoadPercent"] = int16(ADDR_LOAD_PERCENT, registers)
+    result["SInverter"] = int16(25217, registers)
+    result["SGrid"] = int16(25218, registers)
+    result["Sload"] = int16(25219, registers)
+    result["Qinverter"] = int16(25221, registers)
+    result["Qgrid"] = int16(25222, registers)
+    result["Qload"] = int16(25223, registers)
+    result["InverterFrequency"] = int16(25225, registers) / 10.0  # Divide by 10 for frequency
+    result["GridFrequency"] = int16(ADDR_GRID_FREQUENCY, registers) / 10.0
+    result["InverterMaxNumber"] = uint16(25229, registers)
+    result["CombineType"] = uint16(25230, registers)
+    result["InverterNumber"] = uint16(25231, registers)
+    result["AcRadiatorTemperature"] = int16(ADDR_AC_RADIATOR_TEMPERATURE, registers)
+    result["TransformerTemperature"] = int16(ADDR_TRANSFORMER_TEMPERATURE, registers)
+    result["DcRadiatorTemperature"] = int16(ADDR_DC_RADIATOR_TEMPERATURE, registers)
+    result["InverterRelayState"] = int16(25237, registers)
+    result["GridRelayState"] = int16(25238, registers)
+    result["LoadRelayState"] = int16(25239, registers)
+    result["N_LineRelayState"] = int16(25240, registers)
+    result["DCRelayState"] = int16(25241, registers)
+    result["EarthRelayState"] = int16(25242, registers)
+    result["AccumulatedChargerPower"] = accumulated_kwh(25245, registers)
+    result["AccumulatedDischargerPower"] = accumulated_kwh(25247, registers)
+    result["AccumulatedBuyPower"] = accumulated_kwh(25249, registers)
+    result["AccumulatedSellPower"] = accumulated_kwh(25251, registers)
+    result["AccumulatedLoadPower"] = accumulated_kwh(25253, registers)
+    result["AccumulatedSelfUsePower"] = accumulated_kwh(25255, registers)
+    result["AccumulatedPvSellPower"] = accumulated_kwh(25257, registers)
+    result["AccumulatedGridChargerPower"] = accumulated_kwh(25259, registers)
+    result["InverterErrorMessage"] = error_bits(ADDR_INVERTER_ERROR, registers, INVERTER_ERROR_MAP, INVERTER_ERROR_REGISTERS)
+    result["InverterWarningMessage"] = error_bits(ADDR_INVERTER_WARNING, registers, INVERTER_WARNING_MAP, INVERTER_WARNING_REGISTERS)
+    result["BattPower"] = int16(25273, registers)
+    result["BattCurrent"] = int16(25274, registers) / 10.0
+    result["RatedPowerW"] = int16(25277, registers)
     return result
 
 
-def convert_partArr3(registers: Dict[int, int]) -> Dict[str, Any]:
+def decode_partArr3(registers: RegisterBank) -> Dict[str, Any]:
     """
-    Convert partArr3 registers (charger data).
-    Addresses starting from 15201.
+    Full partArr3 register map (charger data), addresses starting from 15201.
+    For diagnostics and new fields; the telemetry itself uses convert_partArr3.
     """
     if not registers:
         return {}
     
     result = {}
-    try:
-        result["ChargerWorkstate"] = int16(15201, registers)
-        result["MpptState"] = int16(15202, registers)
-        result["ChargingState"] = int16(15203, registers)
-        result["PvVoltage"] = int16(15205, registers) / 10.0
-        result["BatteryVoltage"] = int16(15206, registers) / 10.0
-        result["ChargerCurrent"] = int16(15207, registers) / 10.0
-        result["ChargerPower"] = int16(15208, registers)
-        result["RadiatorTemperature"] = int16(15209, registers)
-        result["ExternalTemperature"] = int16(15210, registers)
-        result["BatteryRelay"] = int16(15211, registers)
-        result["PvRelay"] = int16(15212, registers)
-        result["ChargerErrorMessage"] = error_bits(15213, registers, CHARGER_ERROR)
-        result["ChargerWarningMessage"] = error_bits(15214, registers, CHARGER_WARNING)
-        result["BattVolGrade"] = int16(15215, registers)
-        result["RatedCurrent"] = int16(15216, registers)
-        result["AccumulatedPower"] = accumulated_kwh(15217, registers)
-        result["AccumulatedTime"] = time_seconds(15219, registers)
-    except Exception as e:
-        _LOGGER.error(f"Error converting partArr3: {e}")
-    
+    result["ChargerWorkstate"] = int16(15201, registers)
+    result["MpptState"] = int16(15202, registers)
+    result["ChargingState"] = int16(15203, registers)
+    result["PvVoltage"] = int16(15205, registers) / 10.0
+    result["BatteryVoltage"] = int16(ADDR_CHARGER_BATTERY_VOLTAGE, registers) / 10.0
+    result["ChargerCurrent"] = int16(15207, registers) / 10.0
+    result["ChargerPower"] = int16(15208, registers)
+    result["RadiatorTemperature"] = int16(ADDR_CHARGER_RADIATOR_TEMPERATURE, registers)
+    result["ExternalTemperature"] = int16(15210, registers)
+    result["BatteryRelay"] = int16(15211, registers)
+    result["PvRelay"] = int16(15212, registers)
+    result["ChargerErrorMessage"] = error_bits(15213, registers, CHARGER_ERROR_MAP, CHARGER_ERROR_REGISTERS)
+    result["ChargerWarningMessage"] = error_bits(15214, registers, CHARGER_WARNING_MAP, CHARGER_WARNING_REGISTERS)
+    result["BattVolGrade"] = int16(15215, registers)
+    result["RatedCurrent"] = int16(15216, registers)
+    result["AccumulatedPower"] = accumulated_kwh(15217, registers)
+    result["AccumulatedTime"] = time_seconds(15219, registers)
     return result
 
 
-def convert_battery_status(registers: Dict[int, int]) -> Dict[str, Any]:
-    """Convert battery status registers (PV1900 compatible)."""
+def decode_battery_status(registers: RegisterBank) -> Dict[str, Any]:
+    """Battery status registers (PV1900 compatible), direct addresses 113+."""
     result = {}
-    try:
-        if 113 in registers:
-            result["StateOfCharge"] = registers[113]  # Battery level %
-        if 114 in registers:
-            result["BatteryStateOfHealth"] = registers[114]
-    except Exception as e:
-        _LOGGER.debug(f"Battery status not available: {e}")
+    if 113 in registers:
+        result["StateOfCharge"] = registers[113]  # Battery level %
+    if 114 in registers:
+        result["BatteryStateOfHealth"] = registers[114]
     return result
 
 
@@ -252,7 +314,7 @@ def convert_battery_status(registers: Dict[int, int]) -> Dict[str, Any]:
 # Main parser function
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class UPSTelemetryModbus:
     """Extended telemetry structure with Modbus parsing"""
     # Basic values (matching current structure)
@@ -282,136 +344,161 @@ class UPSTelemetryModbus:
     warning_message: str = ""
 
 
+def convert_partArr6(registers: RegisterBank, telemetry: UPSTelemetryModbus) -> None:
+    """
+    Convert partArr6 registers (main inverter data) straight into the telemetry.
+    Addresses starting from 25201.
+    """
+    # Map to telemetry structure
+    # Note: InverterVoltage is output, GridVoltage is input
+    # GridVoltage and GridFrequency each feed two fields: read once into locals
+    grid_voltage = int16(ADDR_GRID_VOLTAGE, registers) / 10.0
+    grid_frequency = int16(ADDR_GRID_FREQUENCY, registers) / 10.0
+    telemetry.output_voltage = int16(ADDR_INVERTER_VOLTAGE, registers) / 10.0  # Output voltage (to load)
+    telemetry.input_voltage = grid_voltage  # Input voltage (from grid/network)
+    telemetry.battery_voltage = int16(ADDR_INVERTER_BATTERY_VOLTAGE, registers) / 10.0
+    telemetry.load_percent = int16(ADDR_LOAD_PERCENT, registers)
+    telemetry.load_power = int16(ADDR_P_LOAD, registers)
+    telemetry.frequency = grid_frequency
+    telemetry.input_frequency = grid_frequency
+    
+    # Extended values
+    telemetry.grid_voltage = grid_voltage
+    telemetry.bus_voltage = int16(ADDR_BUS_VOLTAGE, registers) / 10.0
+    telemetry.inverter_current = int16(ADDR_INVERTER_CURRENT, registers) / 10.0
+    telemetry.grid_current = int16(ADDR_GRID_CURRENT, registers) / 10.0
+    telemetry.load_current = int16(ADDR_LOAD_CURRENT, registers) / 10.0
+    telemetry.inverter_power = int16(ADDR_P_INVERTER, registers)
+    telemetry.grid_power = int16(ADDR_P_GRID, registers)
+    telemetry.work_state = int16(ADDR_WORK_STATE, registers)
+    telemetry.error_message = error_bits(ADDR_INVERTER_ERROR, registers, INVERTER_ERROR_MAP, INVERTER_ERROR_REGISTERS)
+    telemetry.warning_message = error_bits(ADDR_INVERTER_WARNING, registers, INVERTER_WARNING_MAP, INVERTER_WARNING_REGISTERS)
+    
+    # Temperature - try different sources (AC radiator, transformer, DC radiator)
+    telemetry.temperature = (
+        int16(ADDR_AC_RADIATOR_TEMPERATURE, registers) or
+        int16(ADDR_TRANSFORMER_TEMPERATURE, registers) or
+        int16(ADDR_DC_RADIATOR_TEMPERATURE, registers) or
+        0
+    )
+    
+    # Status based on work state or voltage
+    if grid_voltage > 200:
+        telemetry.status = "online"
+    else:
+        telemetry.status = "battery"
+
+
+def convert_partArr3(registers: RegisterBank, telemetry: UPSTelemetryModbus) -> None:
+    """
+    Convert partArr3 registers (charger data) into the telemetry.
+    Addresses starting from 15201; only overrides fields that are reported.
+    """
+    # Override battery voltage if available
+    battery_voltage = int16(ADDR_CHARGER_BATTERY_VOLTAGE, registers) / 10.0
+    if battery_voltage > 0:
+        telemetry.battery_voltage = battery_voltage
+    
+    # Temperature from charger
+    radiator_temperature = int16(ADDR_CHARGER_RADIATOR_TEMPERATURE, registers)
+    if radiator_temperature > 0:
+        telemetry.temperature = radiator_temperature
+
+
 def parse_telemetry_modbus(data: bytes, uptime: str = "") -> UPSTelemetryModbus:
     """
     Parse telemetry using Modbus-like register approach.
     This is an experimental parser that maps registers to known addresses.
     """
     telemetry = UPSTelemetryModbus()
-    telemetry.timestamp = __import__('datetime').datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    telemetry.timestamp = f"{datetime.now():%Y-%m-%d %H:%M:%S}"
     telemetry.uptime = uptime
     
     if len(data) < 5:
         return telemetry
     
+    # The payload is decoded once; the three address windows below all read
+    # the same register tuple
+    values = decode_registers(data)
+    
     # Try to parse as partArr6 (main inverter data) - addresses 25201+
-    registers_6 = convert_registers_to_dict(data, start_address=25201)
+    registers_6 = RegisterBank(25201, values)
     if registers_6:
-        part6 = convert_partArr6(registers_6)
-        
-        # Map to telemetry structure
-        # Note: InverterVoltage is output, GridVoltage is input
-        telemetry.output_voltage = part6.get("InverterVoltage", 0.0)  # Output voltage (to load)
-        telemetry.input_voltage = part6.get("GridVoltage", 0.0)  # Input voltage (from grid/network)
-        telemetry.battery_voltage = part6.get("InverterBatteryVoltage", 0.0)
-        telemetry.load_percent = part6.get("LoadPercent", 0)
-        telemetry.load_power = part6.get("PLoad", 0)
-        telemetry.frequency = part6.get("GridFrequency", 0.0)
-        telemetry.input_frequency = part6.get("GridFrequency", 0.0)
-        
-        # Extended values
-        telemetry.grid_voltage = part6.get("GridVoltage", 0.0)
-        telemetry.bus_voltage = part6.get("BusVoltage", 0.0)
-        telemetry.inverter_current = part6.get("InverterCurrent", 0.0)
-        telemetry.grid_current = part6.get("GridCurrent", 0.0)
-        telemetry.load_current = part6.get("LoadCurrent", 0.0)
-        telemetry.inverter_power = part6.get("PInverter", 0)
-        telemetry.grid_power = part6.get("PGrid", 0)
-        telemetry.work_state = part6.get("WorkState", 0)
-        telemetry.error_message = part6.get("InverterErrorMessage", "")
-        telemetry.warning_message = part6.get("InverterWarningMessage", "")
-        
-        # Temperature - try different sources
-        telemetry.temperature = (
-            part6.get("AcRadiatorTemperature", 0) or
-            part6.get("TransformerTemperature", 0) or
-            part6.get("DcRadiatorTemperature", 0) or
-            0
-        )
-        
-        # Status based on work state or voltage
-        if telemetry.input_voltage > 200:
-            telemetry.status = "online"
-        else:
-            telemetry.status = "battery"
+        convert_partArr6(registers_6, telemetry)
     
     # Try to parse as partArr3 (charger data) - addresses 15201+
-    registers_3 = convert_registers_to_dict(data, start_address=15201)
-    if registers_3:
-        part3 = convert_partArr3(registers_3)
-        
-        # Override battery voltage if available
-        if part3.get("BatteryVoltage", 0) > 0:
-            telemetry.battery_voltage = part3.get("BatteryVoltage", 0.0)
-        
-        # Temperature from charger
-        if part3.get("RadiatorTemperature", 0) > 0:
-            telemetry.temperature = part3.get("RadiatorTemperature", 0)
+    # It only supplies battery voltage and temperature, which direct registers
+    # 13 and 17 override below, so it only matters for frames too short to carry them
+    if len(values) <= 17:
+        registers_3 = RegisterBank(15201, values)
+        if registers_3:
+            convert_partArr3(registers_3, telemetry)
     
     # Direct register access from main response (addresses 0, 1, 2, ...)
     # These are relative addresses after parsing the response
     # Register addresses based on actual UPS data structure from scanner
-    registers_direct = convert_registers_to_dict(data, start_address=0)
+    # Base address is 0, so the address is the tuple index: no bank needed,
+    # presence is a single length comparison
+    count = len(values)
+    
+    # Battery status registers (address 113+, see decode_battery_status) are not
+    # read here: a frame that carries them also carries register 16, which sets
+    # battery_level unconditionally below
+    
+    # Register 4: Input voltage (входящее напряжение) - value/10 (e.g., 2240 -> 224.00V)
+    if count > 4:
+        telemetry.input_voltage = values[4] / 10.0
+    
+    # Register 5: Input frequency (частота входа) - value/10 (e.g., 499 -> 49.90Hz)
+    if count > 5:
+        input_frequency = values[5] / 10.0
+        telemetry.input_frequency = input_frequency
+        telemetry.frequency = input_frequency  # Also set main frequency
+    
+    # Register 6: Output voltage (выходящее напряжение) - value/10 (e.g., 2240 -> 224.00V)
+    if count > 6:
+        telemetry.output_voltage = values[6] / 10.0
+    
+    # Register 7: Output frequency (частота выхода) - value/10 (e.g., 499 -> 49.90Hz)
+    if count > 7:
+        # Output frequency, can be stored separately if needed
+        # For now, we'll use input_frequency for both
+        if telemetry.frequency == 0:
+            telemetry.frequency = values[7] / 10.0
+    
+    # Register 9: Load power in watts (нагрузка в ваттах)
+    # Value is directly in watts
+    # This has priority over register 10
+    if count > 9:
+        load_power_raw = values[9]
+        telemetry.load_power = load_power_raw
+    # Register 10: Load power in VA (нагрузка в VA) - value/10 (e.g., 163 -> 16.3 VA)
+    # Only use if register 9 is not available
+    elif count > 10:
+        load_va_raw = values[10]
+        telemetry.load_power = int(load_va_raw / 10.0)  # Store as VA in load_power field
+    
+    # Register 11: Load percentage (нагрузка в процентах) - direct value (e.g., 20 -> 20%)
+    if count > 11:
+        load_pct_raw = values[11]
+        # Value is already in percent (0-100)
+        telemetry.load_percent = load_pct_raw
+    
+    # Register 13: Battery voltage (напряжение батареи) - value/10 (e.g., 136 -> 13.60V)
+    if count > 13:
+        telemetry.battery_voltage = values[13] / 10.0
+    
+    # Register 16: Battery level (заряд батареи в процентах) - direct value (e.g., 100 -> 100%)
+    if count > 16:
+        batt_level_raw = values[16]
+        # Value is already in percent (0-100)
+        telemetry.battery_level = batt_level_raw
     
-    # Try battery status registers (address 113+) - reuse registers_direct
-    if registers_direct:
-        battery_status = convert_battery_status(registers_direct)
-        if battery_status.get("StateOfCharge", 0) > 0:
-            telemetry.battery_level = battery_status.get("StateOfCharge", 0)
-    if registers_direct:
-        # Register 4: Input voltage (входящее напряжение) - value/10 (e.g., 2240 -> 224.00V)
-        if 4 in registers_direct:
-            telemetry.input_voltage = registers_direct[4] / 10.0
-        
-        # Register 5: Input frequency (частота входа) - value/10 (e.g., 499 -> 49.90Hz)
-        if 5 in registers_direct:
-            telemetry.input_frequency = registers_direct[5] / 10.0
-            telemetry.frequency = registers_direct[5] / 10.0  # Also set main frequency
-        
-        # Register 6: Output voltage (выходящее напряжение) - value/10 (e.g., 2240 -> 224.00V)
-        if 6 in registers_direct:
-            telemetry.output_voltage = registers_direct[6] / 10.0
-        
-        # Register 7: Output frequency (частота выхода) - value/10 (e.g., 499 -> 49.90Hz)
-        if 7 in registers_direct:
-            # Output frequency, can be stored separately if needed
-            # For now, we'll use input_frequency for both
-            if telemetry.frequency == 0:
-                telemetry.frequency = registers_direct[7] / 10.0
-        
-        # Register 9: Load power in watts (нагрузка в ваттах)
-        # Value is directly in watts
-        # This has priority over register 10
-        if 9 in registers_direct:
-            load_power_raw = registers_direct[9]
-            telemetry.load_power = load_power_raw
-        # Register 10: Load power in VA (нагрузка в VA) - value/10 (e.g., 163 -> 16.3 VA)
-        # Only use if register 9 is not available
-        elif 10 in registers_direct:
-            load_va_raw = registers_direct[10]
-            telemetry.load_power = int(load_va_raw / 10.0)  # Store as VA in load_power field
-        
-        # Register 11: Load percentage (нагрузка в процентах) - direct value (e.g., 20 -> 20%)
-        if 11 in registers_direct:
-            load_pct_raw = registers_direct[11]
-            # Value is already in percent (0-100)
-            telemetry.load_percent = load_pct_raw
-        
-        # Register 13: Battery voltage (напряжение батареи) - value/10 (e.g., 136 -> 13.60V)
-        if 13 in registers_direct:
-            telemetry.battery_voltage = registers_direct[13] / 10.0
-        
-        # Register 16: Battery level (заряд батареи в процентах) - direct value (e.g., 100 -> 100%)
-        if 16 in registers_direct:
-            batt_level_raw = registers_direct[16]
-            # Value is already in percent (0-100)
-            telemetry.battery_level = batt_level_raw
-        
-        # Register 17: Temperature (температура) - direct value (e.g., 34 -> 34°C)
-        if 17 in registers_direct:
-            temp_raw = registers_direct[17]
-            # Temperature is typically 20-50°C, so use as is if reasonable
-            # If > 100, might need division, otherwise use directly
-            telemetry.temperature = temp_raw if temp_raw < 100 else temp_raw / 10.0
+    # Register 17: Temperature (температура) - direct value (e.g., 34 -> 34°C)
+    if count > 17:
+        temp_raw = values[17]
+        # Temperature is typically 20-50°C, so use as is if reasonable
+        # If > 100, might need division, otherwise use directly
+        telemetry.temperature = temp_raw if temp_raw < 100 else temp_raw / 10.0
     
     return telemetry